@@ -8,11 +8,16 @@ incorrectly labeled due to the original bug in the ingest system.
 
 import argparse
 import logging
+import os
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 
 # Configure logging
 logging.basicConfig(
@@ -21,16 +26,64 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def parse_timestamp(timestamp_str: str) -> datetime:
-    """Parse timestamp from various formats."""
-    # Handle format like "2025:09:10T06:18:09Z"
-    if ":" in timestamp_str and timestamp_str.count(":") > 2:
-        # Convert "2025:09:10T06:18:09Z" to "2025-09-10T06:18:09Z"
-        timestamp_str = timestamp_str.replace(":", "-", 2)
-    
-    # Remove 'Z' if present and parse
-    timestamp_str = timestamp_str.rstrip('Z')
-    return datetime.fromisoformat(timestamp_str)
+def parse_timestamps(timestamps: pd.Series) -> pd.Series:
+    """Parse a Series of timestamp strings from various formats in one pass."""
+    # Handle format like "2025:09:10T06:18:09Z" -> "2025-09-10T06:18:09Z" with
+    # a single compiled-regex pass in Arrow, then remove the trailing 'Z'
+    fixed = pc.replace_substring_regex(
+        pa.array(timestamps, type=pa.string()),
+        pattern=r"^(\d{4}):(\d{2}):(\d{2})T",
+        replacement=r"\1-\2-\3T",
+    )
+    fixed = pc.utf8_rtrim(fixed, characters="Z")
+    return pd.to_datetime(
+        fixed.to_pandas().set_axis(timestamps.index), format="ISO8601"
+    )
+
+
+def rewrite_experiment_labels(
+    parquet_path: Path,
+    new_labels: pd.Categorical,
+    synced_at_ts: np.ndarray,
+    batch_size: int = 100_000,
+) -> None:
+    """Stream the parquet file batch by batch, replacing experiment_label.
+
+    The parsed synced_at timestamps are written to ``synced_at_ts`` as well,
+    completing the column for files curated by older versions of ingest.
+    """
+    parquet_file = pq.ParquetFile(parquet_path)
+    schema = parquet_file.schema_arrow
+    label_index = schema.get_field_index("experiment_label")
+    labels = pa.array(new_labels)
+    schema = schema.set(label_index, pa.field("experiment_label", labels.type))
+
+    timestamps = pa.array(synced_at_ts)
+    ts_field = pa.field("synced_at_ts", timestamps.type)
+    ts_index = schema.get_field_index("synced_at_ts")
+    if ts_index == -1:
+        ts_index = len(schema)
+        schema = schema.append(ts_field)
+    else:
+        schema = schema.set(ts_index, ts_field)
+
+    # Write next to the original and swap in atomically once complete
+    tmp_path = parquet_path.with_name(f".{parquet_path.name}.tmp")
+    offset = 0
+    with pq.ParquetWriter(
+        tmp_path, schema, compression="zstd", compression_level=3
+    ) as writer:
+        for batch in parquet_file.iter_batches(batch_size=batch_size):
+            columns = batch.columns
+            columns[label_index] = labels.slice(offset, batch.num_rows)
+            if ts_index == len(columns):
+                columns.append(timestamps.slice(offset, batch.num_rows))
+            else:
+                columns[ts_index] = timestamps.slice(offset, batch.num_rows)
+            offset += batch.num_rows
+            writer.write_batch(pa.RecordBatch.from_arrays(columns, schema=schema))
+
+    os.replace(tmp_path, parquet_path)
 
 
 def main():
@@ -67,10 +120,16 @@ def main():
         logger.error(f"Parquet file not found: {parquet_path}")
         return 1
     
-    # Load data
+    # Load only the columns needed to plan the relabel
     logger.info(f"Loading data from {parquet_path}")
-    df = pd.read_parquet(parquet_path)
+    columns = ['snapshot_file', 'experiment_label', 'synced_at']
+    if 'synced_at_ts' in pq.read_schema(parquet_path).names:
+        columns.append('synced_at_ts')
+    df = pd.read_parquet(parquet_path, columns=columns)
     logger.info(f"Loaded {len(df)} rows")
+
+    # Labels are a handful of repeated strings; keep them as categories
+    df['experiment_label'] = df['experiment_label'].astype('category')
     
     # Parse cutoff time
     try:
@@ -80,15 +139,21 @@ def main():
         logger.error(f"Invalid cutoff time format: {e}")
         return 1
     
-    # Convert synced_at to datetime for comparison
-    df['_synced_at_dt'] = df['synced_at'].apply(parse_timestamp)
+    # Convert synced_at to datetime, reusing the synced_at_ts column written by
+    # ingest and parsing only rows that lack it (files from older versions)
+    df['_synced_at_dt'] = df['synced_at_ts'] if 'synced_at_ts' in df.columns else pd.NaT
+    missing = df['_synced_at_dt'].isna()
+    if missing.any():
+        df['_synced_at_dt'] = df['_synced_at_dt'].fillna(
+            parse_timestamps(df.loc[missing, 'synced_at'])
+        )
     
     # Show current state
     logger.info("Current experiment labels:")
     print(df['experiment_label'].value_counts())
     
     logger.info("Snapshot timing:")
-    timing_df = df.groupby(['snapshot_file', 'experiment_label']).agg({
+    timing_df = df.groupby(['snapshot_file', 'experiment_label'], observed=True).agg({
         '_synced_at_dt': ['min', 'max', 'count']
     }).reset_index()
     timing_df.columns = ['snapshot_file', 'experiment_label', 'min_time', 'max_time', 'count']
@@ -96,35 +161,48 @@ def main():
     print(timing_df)
     
     # Create new labels based on cutoff
-    new_labels = []
-    for idx, row in df.iterrows():
-        if row['_synced_at_dt'] < cutoff_time:
-            new_labels.append(args.old_label)
-        else:
-            new_labels.append(args.new_label)
+    # Compare as int64 ticks in the column's own unit; NaT is never before
+    synced_at = df['_synced_at_dt'].to_numpy()
+    cutoff = pd.Timestamp(cutoff_time).to_datetime64().astype(synced_at.dtype)
+    ticks = synced_at.view('int64')
+    before_cutoff = (ticks < cutoff.view('int64')) & (ticks != np.iinfo(np.int64).min)
+    n_before = int(before_cutoff.sum())
+    logger.info(
+        f"Rows before cutoff: {n_before}, at or after cutoff: {len(before_cutoff) - n_before}"
+    )
+    # Build the categorical from codes so no per-row label strings are created;
+    # drop a label no row ends up with, as ingest does before writing
+    label_dtype = pd.CategoricalDtype(
+        categories=list(dict.fromkeys([args.old_label, args.new_label]))
+    )
+    codes = np.where(before_cutoff, 0, len(label_dtype.categories) - 1)
+    df['_new_experiment_label'] = pd.Categorical.from_codes(
+        codes, dtype=label_dtype
+    ).remove_unused_categories()
     
     # Show what would change
-    df['_new_experiment_label'] = new_labels
-    changes_df = df.groupby(['experiment_label', '_new_experiment_label']).size().reset_index(name='count')
+    changes_df = pd.crosstab(
+        df['experiment_label'], df['_new_experiment_label'], colnames=['new_label']
+    )
     
-    logger.info("Proposed changes:")
-    print(changes_df)
+    logger.info("Proposed changes (current label x new label):")
+    print(changes_df.to_string())
     
     if args.dry_run:
         logger.info("Dry run - no changes made")
         return 0
     
-    # Apply changes
-    df['experiment_label'] = df['_new_experiment_label']
-    df = df.drop(columns=['_synced_at_dt', '_new_experiment_label'])
-    
-    # Save updated file
+    # Apply changes, streaming the full table through to the updated file
     logger.info(f"Saving updated data to {parquet_path}")
-    df.to_parquet(parquet_path, index=False, compression="snappy")
+    rewrite_experiment_labels(
+        parquet_path,
+        df['_new_experiment_label'].array,
+        df['_synced_at_dt'].to_numpy(),
+    )
     
     # Show final state
     logger.info("Final experiment labels:")
-    print(df['experiment_label'].value_counts())
+    print(df['_new_experiment_label'].value_counts().rename_axis('experiment_label'))
     
     logger.info("Fix complete!")
     return 0
@@ -7,24 +7,40 @@ and writes a single curated Parquet file for analysis.
 """
 
 import argparse
-import hashlib
 import logging
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from functools import partial
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
 import yaml
 from dotenv import load_dotenv
 
+# Use libyaml's C parser when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
 logger = logging.getLogger(__name__)
 
+# Marks curated files written by this version; older ones keyed rows parsed by
+# pandas and cannot be appended to (see is_current_curated_file)
+CURATED_FORMAT_KEY = b"kraken_analyzer.curated_format"
+CURATED_FORMAT_VERSION = b"2"
+
 
 def load_config(config_path: Path, env_path: Path) -> Dict[str, Any]:
     """Load configuration from YAML file and .env file."""
@@ -37,7 +53,7 @@ def load_config(config_path: Path, env_path: Path) -> Dict[str, Any]:
 
     try:
         with open(config_path, "r") as f:
-            config = yaml.safe_load(f)
+            config = yaml.load(f, Loader=SafeLoader)
 
         # Override with environment variables if they exist
         if "sources" in config and len(config["sources"]) > 0:
@@ -57,134 +73,403 @@ def load_config(config_path: Path, env_path: Path) -> Dict[str, Any]:
 
 
 def get_snapshot_files(snapshots_dir: Path) -> List[Path]:
-    """Get all CSV snapshot files sorted by modification time."""
+    """Get all CSV snapshot files sorted oldest first.
+
+    Relies on sync_server.sh naming snapshots run_results.YYYY-MM-DDTHH-MM-SSZ.csv
+    (UTC), which sorts by name in time order without a stat() per file.
+    """
     pattern = "run_results.*.csv"
     files = list(snapshots_dir.glob(pattern))
     # Exclude temp files
     files = [f for f in files if not f.name.startswith(".")]
-    files.sort(key=lambda f: f.stat().st_mtime)
+    files.sort(key=lambda f: f.name)
     logger.info(f"Found {len(files)} snapshot files")
     return files
 
 
-def extract_timestamp_from_filename(filepath: Path) -> Optional[str]:
-    """Extract UTC timestamp from filename like run_results.2025-09-08T10-15-30Z.csv"""
+def extract_timestamps_from_filenames(files: List[Path]) -> Dict[str, Optional[str]]:
+    """Extract UTC timestamps from filenames like run_results.2025-09-08T10-15-30Z.csv"""
+    names = pd.Series([f.name for f in files], dtype=object)
+    # Extract timestamp part between run_results. and .csv and convert back to
+    # standard ISO format, for all files in one pass
+    timestamps = names.str.extract(r"^run_results\.(.+)\.csv$", expand=False)
+    timestamps = timestamps.str.replace("-", ":", regex=False)
+    return dict(zip(names, timestamps.astype(object).where(timestamps.notna(), None)))
+
+
+def read_snapshot_csv(filepath: Path) -> pa.Table:
+    """Read a snapshot CSV with Arrow's multithreaded parser."""
+    read_options = pa_csv.ReadOptions(block_size=8 << 20)
+    # Empty and NA-like text is missing, as it was with pandas
+    convert_options = pa_csv.ConvertOptions(strings_can_be_null=True)
+    table = pa_csv.read_csv(
+        filepath, read_options=read_options, convert_options=convert_options
+    )
+
+    # Arrow infers ISO-looking text as timestamps where pandas kept strings;
+    # re-read those columns verbatim so the curated schema does not change
+    temporal = [
+        field.name for field in table.schema if pa.types.is_temporal(field.type)
+    ]
+    if temporal:
+        convert_options.column_types = {name: pa.string() for name in temporal}
+        table = pa_csv.read_csv(
+            filepath, read_options=read_options, convert_options=convert_options
+        )
+
+    # Arrow types all-empty columns as null; read them as float NaN like pandas
+    for i, field in enumerate(table.schema):
+        if pa.types.is_null(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.float64()))
+
+    return table
+
+
+def union_tables(tables: List[pa.Table]) -> pd.DataFrame:
+    """Union tables with differing columns and convert to pandas once."""
+    # Columns stored as dictionaries anywhere (the metadata labels) get one
+    # common dictionary type so they stay categorical; pandas metadata is
+    # dropped so schemas can merge
+    dictionary_type = pa.dictionary(pa.int32(), pa.string())
+    categorical_columns = {
+        field.name
+        for table in tables
+        for field in table.schema
+        if pa.types.is_dictionary(field.type)
+    }
+    tables = [
+        table.cast(
+            pa.schema(
+                [
+                    field.with_type(dictionary_type)
+                    if field.name in categorical_columns
+                    else field
+                    for field in table.schema
+                ]
+            )
+        ).replace_schema_metadata(None)
+        for table in tables
+    ]
+
     try:
-        # Extract timestamp part between run_results. and .csv
-        name_parts = filepath.stem.split(".")
-        if len(name_parts) >= 2:
-            timestamp_str = ".".join(name_parts[1:])
-            # Convert back to standard ISO format
-            return timestamp_str.replace("-", ":")
-    except Exception:
-        pass
-    return None
+        combined = pa.concat_tables(tables, promote_options="permissive")
+    except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+        # Column types Arrow cannot reconcile (e.g. text vs numbers); pandas
+        # falls back to object columns for those
+        logger.warning(f"Could not union snapshots in Arrow ({e}), using pandas")
+        combined_df = pd.concat(
+            [table.to_pandas() for table in tables], ignore_index=True, sort=False
+        )
+        # Categoricals with differing categories concat to object; restore them
+        for name in categorical_columns:
+            combined_df[name] = combined_df[name].astype("category")
+        return combined_df
+
+    return combined.to_pandas(self_destruct=True, split_blocks=True)
 
 
 def normalize_numeric_columns(df: pd.DataFrame) -> pd.DataFrame:
-    """Attempt to convert obvious numeric columns, handling errors gracefully."""
-    df = df.copy()
+    """Attempt to convert obvious numeric columns, handling errors gracefully.
+
+    Converts the columns of ``df`` in place and returns it.
+    """
 
     # Common numeric column patterns for this domain
     numeric_patterns = ["cost", "latency", "size", "time", "rate", "count", "id"]
 
-    for col in df.columns:
-        col_lower = col.lower()
-        if any(pattern in col_lower for pattern in numeric_patterns):
-            try:
-                # Try to convert to numeric, errors become NaN
-                df[col] = pd.to_numeric(df[col], errors="coerce")
-            except Exception as e:
-                logger.debug(f"Could not convert column {col} to numeric: {e}")
+    numeric_cols = [
+        col
+        for col in df.columns
+        if any(pattern in col.lower() for pattern in numeric_patterns)
+    ]
+    if numeric_cols:
+        # Convert all matching columns at once, errors become NaN
+        df[numeric_cols] = df[numeric_cols].apply(pd.to_numeric, errors="coerce")
 
     return df
 
 
-def generate_dedup_key(row: pd.Series, fallback_columns: List[str]) -> str:
-    """Generate a deduplication key from row data."""
+def generate_dedup_keys(df: pd.DataFrame, fallback_columns: List[str]) -> pd.Series:
+    """Generate a uint64 deduplication key for every row of the DataFrame."""
+    # Rows without any usable values all share the hash of "unknown"
+    unknown_key = pd.util.hash_array(np.array(["unknown"], dtype=object))[0]
+    keys = pd.Series(unknown_key, index=df.index, dtype=np.uint64)
+
     # Primary: use experiment IDs if available
     primary_keys = ["experiment_label", "kraken_simulation_id", "ines_simulation_id"]
-
-    key_parts = []
-    for key in primary_keys:
-        if key in row and pd.notna(row[key]):
-            key_parts.append(f"{key}={row[key]}")
-
-    if len(key_parts) >= 2:  # We have enough primary keys
-        return "|".join(key_parts)
+    present_primary = [key for key in primary_keys if key in df.columns]
+
+    primary_keys_str = pd.Series("", index=df.index, dtype=object)
+    for key in present_primary:
+        values = _canonical_values(df[key]).astype(str)
+        part = (f"{key}=" + values).where(df[key].notna(), "")
+        separator = np.where((primary_keys_str != "") & (part != ""), "|", "")
+        primary_keys_str = primary_keys_str + separator + part
+
+    # We have enough primary keys
+    primary_mask = df[present_primary].notna().sum(axis=1) >= 2
+    if primary_mask.any():
+        keys[primary_mask] = pd.util.hash_pandas_object(
+            primary_keys_str[primary_mask], index=False
+        )
 
     # Fallback: hash key parameter columns
-    fallback_values = []
-    for col in fallback_columns:
-        if col in row and pd.notna(row[col]):
-            fallback_values.append(f"{col}={row[col]}")
-
-    if fallback_values:
-        fallback_str = "|".join(sorted(fallback_values))
-        return hashlib.md5(fallback_str.encode()).hexdigest()
+    present_fallback = [col for col in fallback_columns if col in df.columns]
+    remaining = ~primary_mask
+    fallback_mask = remaining & df[present_fallback].notna().any(axis=1)
+    if fallback_mask.any():
+        keys[fallback_mask] = _hash_rows(df.loc[fallback_mask, present_fallback])
 
     # Last resort: hash all non-metadata columns
     non_metadata_cols = [
         c
-        for c in row.index
+        for c in df.columns
         if not c.startswith(("experiment_", "schema_", "source", "synced_at"))
     ]
-    all_values = []
-    for col in non_metadata_cols:
-        if pd.notna(row[col]):
-            all_values.append(f"{col}={row[col]}")
+    remaining &= ~fallback_mask
+    all_mask = remaining & df[non_metadata_cols].notna().any(axis=1)
+    if all_mask.any():
+        keys[all_mask] = _hash_rows(df.loc[all_mask, non_metadata_cols])
+
+    return keys
+
+
+def _canonical_values(values: pd.Series) -> pd.Series:
+    """Widen numeric values to float64 so keys do not depend on int/float dtype."""
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype("float64")
+    return values
+
+
+def _hash_rows(df: pd.DataFrame) -> pd.Series:
+    """Hash each row's values into a uint64 key in one vectorised pass."""
+    canonical = df[sorted(df.columns)].apply(_canonical_values)
+    return pd.util.hash_pandas_object(canonical, index=False)
+
+
+def parse_synced_at(synced_at: pd.Series) -> pd.Series:
+    """Parse synced_at strings (UTC) into datetimes, NaT where unparseable."""
+    # Timestamps taken from snapshot filenames all share one fixed format
+    parsed = pd.to_datetime(synced_at, format="%Y:%m:%dT%H:%M:%SZ", errors="coerce")
+
+    # Anything else, e.g. the isoformat() fallback for snapshots without one
+    retry = parsed.isna() & synced_at.notna()
+    if retry.any():
+        parsed[retry] = pd.to_datetime(
+            synced_at[retry], format="ISO8601", errors="coerce", utc=True
+        ).dt.tz_localize(None)
+
+    return parsed
+
+
+def fill_synced_at_ts(df: pd.DataFrame) -> pd.DataFrame:
+    """Add ``synced_at_ts`` (synced_at parsed) to ``df`` in place and return it.
+
+    Rows from the existing curated file keep the value stored with them, so
+    only newly ingested rows are parsed.
+    """
+    if "synced_at_ts" not in df.columns:
+        df["synced_at_ts"] = parse_synced_at(df["synced_at"])
+        return df
+
+    missing = df["synced_at_ts"].isna()
+    if missing.any():
+        df.loc[missing, "synced_at_ts"] = parse_synced_at(df.loc[missing, "synced_at"])
+    return df
+
+
+def keep_latest_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """Keep the most recent row by ``synced_at_ts`` for each ``_dedup_key``."""
+    # Only the timestamp column is sorted (stable, NaT last); the wide frame is
+    # gathered once for the surviving rows
+    order = np.argsort(df["synced_at_ts"].to_numpy(), kind="stable")
+    is_stale = df["_dedup_key"].take(order).duplicated(keep="last")
+    return df.take(order[~is_stale.to_numpy()])
+
+
+def get_dedup_index_path(output_path: Path) -> Path:
+    """Path of the sidecar file holding the dedup key of every curated row."""
+    return output_path.with_name(f"{output_path.stem}.dedup_keys.parquet")
+
+
+def _file_fingerprint(path: Path) -> Dict[bytes, bytes]:
+    """Size and mtime of a file, used to tie the dedup index to one parquet write."""
+    stat = path.stat()
+    return {
+        b"source_size": str(stat.st_size).encode(),
+        b"source_mtime_ns": str(stat.st_mtime_ns).encode(),
+    }
+
+
+def load_dedup_index(output_path: Path, expected_rows: int) -> Optional[pd.Series]:
+    """Load stored dedup keys, or None if missing or stale for the parquet file."""
+    index_path = get_dedup_index_path(output_path)
+    if not index_path.exists():
+        return None
+
+    try:
+        table = pq.read_table(index_path)
+        metadata = table.schema.metadata or {}
+        fingerprint = _file_fingerprint(output_path)
+        if table.schema.field("_dedup_key").type != pa.uint64():
+            # Written by an older version with string keys
+            logger.info("Dedup index has an old key format, regenerating all keys")
+            return None
+        if table.num_rows != expected_rows or any(
+            metadata.get(key) != value for key, value in fingerprint.items()
+        ):
+            # The parquet file was rewritten since (e.g. by fix_experiment_labels.py)
+            logger.info("Dedup index is out of date, regenerating all keys")
+            return None
+        return table.column("_dedup_key").to_pandas()
+    except Exception as e:
+        logger.warning(f"Could not read dedup index: {e}")
+        return None
+
+
+def write_dedup_index(keys: pd.Series, output_path: Path) -> None:
+    """Store the dedup keys of the freshly written parquet file alongside it."""
+    table = pa.table({"_dedup_key": pa.array(keys.to_numpy())})
+    table = table.replace_schema_metadata(_file_fingerprint(output_path))
+    pq.write_table(table, get_dedup_index_path(output_path), compression="zstd")
 
-    if all_values:
-        all_str = "|".join(sorted(all_values))
-        return hashlib.md5(all_str.encode()).hexdigest()
 
-    return "unknown"
+def _improvement_pct(baseline: np.ndarray, candidate: np.ndarray) -> np.ndarray:
+    """Percent improvement of candidate over baseline, rounded to 2 decimals."""
+    # Computed in one buffer; division by zero gives inf/NaN like pandas
+    pct = np.subtract(baseline, candidate, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        np.divide(pct, baseline, out=pct)
+    np.multiply(pct, 100, out=pct)
+    return np.round(pct, 2, out=pct)
 
 
 def compute_derived_metrics(df: pd.DataFrame) -> pd.DataFrame:
-    """Compute light derived metrics if the required columns exist."""
-    df = df.copy()
+    """Compute light derived metrics if the required columns exist.
+
+    Adds the metric columns to ``df`` in place and returns it.
+    """
+    cost_pct = latency_pct = None
 
     # Cost delta (Kraken vs INES)
     if "kraken_cost" in df.columns and "ines_cost" in df.columns:
-        df["cost_delta"] = df["kraken_cost"] - df["ines_cost"]
-        df["cost_improvement_pct"] = (
-            (df["ines_cost"] - df["kraken_cost"]) / df["ines_cost"] * 100
-        ).round(2)
+        ines_cost = df["ines_cost"].to_numpy()
+        kraken_cost = df["kraken_cost"].to_numpy()
+        df["cost_delta"] = kraken_cost - ines_cost
+        cost_pct = _improvement_pct(ines_cost, kraken_cost)
+        df["cost_improvement_pct"] = cost_pct
 
     # Latency delta
     if "kraken_latency" in df.columns and "ines_latency" in df.columns:
-        df["latency_delta"] = df["kraken_latency"] - df["ines_latency"]
-        df["latency_improvement_pct"] = (
-            (df["ines_latency"] - df["kraken_latency"]) / df["ines_latency"] * 100
-        ).round(2)
+        ines_latency = df["ines_latency"].to_numpy()
+        kraken_latency = df["kraken_latency"].to_numpy()
+        df["latency_delta"] = kraken_latency - ines_latency
+        latency_pct = _improvement_pct(ines_latency, kraken_latency)
+        df["latency_improvement_pct"] = latency_pct
 
     # Performance score (lower cost + lower latency is better)
     if "cost_improvement_pct" in df.columns and "latency_improvement_pct" in df.columns:
-        df["performance_score"] = (
-            df["cost_improvement_pct"] + df["latency_improvement_pct"]
-        ) / 2
+        if cost_pct is None:
+            cost_pct = df["cost_improvement_pct"].to_numpy()
+        if latency_pct is None:
+            latency_pct = df["latency_improvement_pct"].to_numpy()
+        df["performance_score"] = (cost_pct + latency_pct) / 2
 
     return df
 
 
+def _load_snapshot(
+    filepath: Path, timestamp: Optional[str], source_config: Dict[str, Any]
+) -> Optional[pa.Table]:
+    """Read one snapshot and tag it with metadata; runs in a worker process."""
+    try:
+        logger.info(f"Processing new snapshot: {filepath.name}")
+
+        # Read CSV
+        table = read_snapshot_csv(filepath)
+        logger.debug(
+            f"Loaded {table.num_rows} rows, {table.num_columns} columns from {filepath.name}"
+        )
+
+        labels = {
+            # Use current experiment label for new snapshots
+            "experiment_label": source_config["experiment_label"],
+            "schema_version": source_config["schema_version"],
+            "source": source_config["name"],
+            # Track which snapshot this came from
+            "snapshot_file": filepath.name,
+        }
+        # Labels are constant per snapshot: store each as a one-entry
+        # dictionary (categorical) instead of a string per row
+        codes = pa.array(np.zeros(table.num_rows, dtype=np.int32))
+        metadata = {
+            name: pa.DictionaryArray.from_arrays(codes, pa.array([value]))
+            for name, value in labels.items()
+        }
+        # Timestamp extracted from the filename by the caller
+        metadata["synced_at"] = pa.repeat(
+            timestamp or datetime.utcnow().isoformat(), table.num_rows
+        )
+        for name, column in metadata.items():
+            if name in table.column_names:
+                index = table.column_names.index(name)
+                table = table.set_column(index, name, column)
+            else:
+                table = table.append_column(name, column)
+
+        return table
+
+    except Exception as e:
+        logger.error(f"Failed to process {filepath}: {e}")
+        return None
+
+
 def get_processed_snapshots(output_path: Path) -> set:
     """Get list of snapshots that have already been processed."""
     if not output_path.exists():
         return set()
     
     try:
-        existing_df = pd.read_parquet(output_path)
-        if "snapshot_file" in existing_df.columns:
-            return set(existing_df["snapshot_file"].unique())
+        # Only the snapshot_file column chunks are read from disk
+        if "snapshot_file" in pq.read_schema(output_path).names:
+            table = pq.read_table(output_path, columns=["snapshot_file"])
+            return set(table.column("snapshot_file").unique().to_pylist())
     except Exception as e:
         logger.warning(f"Could not read existing parquet file: {e}")
     
     return set()
 
 
+def is_current_curated_file(output_path: Path) -> bool:
+    """Whether the curated parquet file was written by this version of ingest.
+
+    Older versions parsed snapshots with pandas, whose floats can differ from
+    Arrow's in the last digit, so their rows no longer match the dedup keys
+    of the same rows read again.
+    """
+    try:
+        metadata = pq.read_schema(output_path).metadata or {}
+    except Exception as e:
+        logger.warning(f"Could not read existing parquet file: {e}")
+        return False
+    return metadata.get(CURATED_FORMAT_KEY) == CURATED_FORMAT_VERSION
+
+
+def write_curated_parquet(df: pd.DataFrame, output_path: Path) -> None:
+    """Write the curated dataset, tagged with the current format version."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = table.schema.metadata or {}
+    table = table.replace_schema_metadata(
+        {**metadata, CURATED_FORMAT_KEY: CURATED_FORMAT_VERSION}
+    )
+    pq.write_table(table, output_path, compression="zstd", compression_level=3)
+
+
 def process_snapshots(config: Dict[str, Any], snapshots_dir: Path, output_path: Path) -> pd.DataFrame:
-    """Process only new snapshot files and append to existing dataset."""
+    """Process only new snapshot files and append to existing dataset.
+
+    The returned rows keep their dedup key in a ``_dedup_key`` column.
+    """
     snapshot_files = get_snapshot_files(snapshots_dir)
 
     if not snapshot_files:
@@ -201,83 +486,90 @@ def process_snapshots(config: Dict[str, Any], snapshots_dir: Path, output_path:
     
     logger.info(f"Found {len(new_snapshot_files)} new snapshots to process (out of {len(snapshot_files)} total)")
 
-    all_dataframes = []
     source_config = config["sources"][0]  # Assuming single source for now
-
-    for filepath in new_snapshot_files:
-        try:
-            logger.info(f"Processing new snapshot: {filepath.name}")
-
-            # Read CSV
-            df = pd.read_csv(filepath)
-            logger.debug(
-                f"Loaded {len(df)} rows, {len(df.columns)} columns from {filepath.name}"
+    load_snapshot = partial(_load_snapshot, source_config=source_config)
+    timestamps = extract_timestamps_from_filenames(new_snapshot_files)
+    file_timestamps = [timestamps[f.name] for f in new_snapshot_files]
+
+    # CSV parsing dominates cold ingests and is independent per file
+    if len(new_snapshot_files) > 1:
+        with ProcessPoolExecutor() as executor:
+            loaded = list(
+                executor.map(load_snapshot, new_snapshot_files, file_timestamps)
             )
+    else:
+        loaded = list(map(load_snapshot, new_snapshot_files, file_timestamps))
+    all_tables = [table for table in loaded if table is not None]
 
-            # Add metadata columns - use current experiment label for new snapshots
-            df["experiment_label"] = source_config["experiment_label"]
-            df["schema_version"] = source_config["schema_version"]
-            df["source"] = source_config["name"]
-            df["snapshot_file"] = filepath.name  # Track which snapshot this came from
-
-            # Extract timestamp from filename
-            timestamp = extract_timestamp_from_filename(filepath)
-            df["synced_at"] = timestamp or datetime.utcnow().isoformat()
-
-            all_dataframes.append(df)
-
-        except Exception as e:
-            logger.error(f"Failed to process {filepath}: {e}")
-            continue
-
-    if not all_dataframes:
+    if not all_tables:
         logger.info("No new data to process")
         return pd.DataFrame()
 
-    # Union all new dataframes
-    logger.info("Unioning new dataframes...")
-    combined_df = pd.concat(all_dataframes, ignore_index=True, sort=False)
-    logger.info(
-        f"New data: {len(combined_df)} rows, {len(combined_df.columns)} columns"
-    )
+    new_rows = sum(table.num_rows for table in all_tables)
+    new_columns = set().union(*(table.column_names for table in all_tables))
+    logger.info(f"New data: {new_rows} rows, {len(new_columns)} columns")
 
-    # Load existing data and combine with new data
+    # Load existing data to combine with new data
+    existing_rows = 0
     if output_path.exists():
         try:
-            existing_df = pd.read_parquet(output_path)
-            logger.info(f"Loading existing data: {len(existing_df)} rows")
-            combined_df = pd.concat([existing_df, combined_df], ignore_index=True, sort=False)
-            logger.info(f"Total combined data: {len(combined_df)} rows")
+            existing_table = pq.read_table(output_path)
+            existing_rows = existing_table.num_rows
+            logger.info(f"Loading existing data: {existing_rows} rows")
+            all_tables.insert(0, existing_table)
         except Exception as e:
             logger.warning(f"Could not load existing data: {e}, treating as new dataset")
 
+    # Union existing and new data, staying in Arrow until the final conversion
+    logger.info("Unioning tables...")
+    combined_df = union_tables(all_tables)
+    logger.info(f"Total combined data: {len(combined_df)} rows")
+
     # Normalize numeric columns
     logger.info("Normalizing numeric columns...")
     combined_df = normalize_numeric_columns(combined_df)
+    combined_df = fill_synced_at_ts(combined_df)
 
     # Deduplicate
     logger.info("Deduplicating rows...")
     fallback_columns = config.get("analysis", {}).get("required_columns", [])
 
-    # Generate dedup keys
-    combined_df["_dedup_key"] = combined_df.apply(
-        lambda row: generate_dedup_key(row, fallback_columns), axis=1
+    # Generate dedup keys, reusing the stored keys of existing rows if possible
+    existing_keys = (
+        load_dedup_index(output_path, existing_rows) if existing_rows else None
     )
+    if existing_keys is None:
+        combined_df["_dedup_key"] = generate_dedup_keys(combined_df, fallback_columns)
+        collides = True
+    else:
+        new_keys = generate_dedup_keys(
+            combined_df.iloc[existing_rows:], fallback_columns
+        )
+        combined_df["_dedup_key"] = np.concatenate(
+            [existing_keys.to_numpy(), new_keys.to_numpy()]
+        )
+        collides = new_keys.isin(existing_keys).any()
 
     # Keep the most recent entry for each dedup key
-    combined_df["_synced_at_dt"] = pd.to_datetime(
-        combined_df["synced_at"], errors="coerce"
-    )
-    dedup_df = combined_df.sort_values("_synced_at_dt").drop_duplicates(
-        subset=["_dedup_key"], keep="last"
-    )
-
-    # Clean up temporary columns
-    dedup_df = dedup_df.drop(columns=["_dedup_key", "_synced_at_dt"])
+    if collides:
+        dedup_df = keep_latest_rows(combined_df)
+    else:
+        # Existing rows are already unique and nothing new replaces them
+        logger.info("No new rows collide with existing data, deduplicating new rows only")
+        dedup_df = pd.concat(
+            [
+                combined_df.iloc[:existing_rows],
+                keep_latest_rows(combined_df.iloc[existing_rows:]),
+            ]
+        )
 
     duplicates_removed = len(combined_df) - len(dedup_df)
     logger.info(f"Removed {duplicates_removed} duplicate rows")
 
+    # Forget labels (e.g. snapshot files) whose rows were all superseded
+    for name in dedup_df.select_dtypes("category").columns:
+        dedup_df[name] = dedup_df[name].cat.remove_unused_categories()
+
     return dedup_df
 
 
@@ -318,9 +610,29 @@ def main():
         if output_path.exists():
             logger.info("Resetting: removing existing parquet file")
             output_path.unlink()
+            get_dedup_index_path(output_path).unlink(missing_ok=True)
         else:
             logger.info("Reset requested but no existing parquet file found")
 
+    # New snapshots cannot be appended to a file from an older version without
+    # duplicating its rows; rebuilding it would relabel them, so leave that to
+    # the user (make ingest-reset). Without new snapshots nothing is appended.
+    if output_path.exists() and not is_current_curated_file(output_path):
+        processed_snapshots = get_processed_snapshots(output_path)
+        new_snapshots = [
+            f.name
+            for f in get_snapshot_files(snapshots_dir)
+            if f.name not in processed_snapshots
+        ]
+        if new_snapshots:
+            logger.error(
+                f"{output_path} was written by an older version of ingest; "
+                f"refusing to append {len(new_snapshots)} new snapshots to it, "
+                "as its rows would be duplicated. Run `make ingest-reset` once "
+                "(see README: Upgrading from an older version)"
+            )
+            sys.exit(1)
+
     # Load configuration
     logger.info(f"Loading config from {config_path}")
     config = load_config(config_path, env_path)
@@ -337,13 +649,16 @@ def main():
             logger.info("No new data to process, existing file unchanged")
             return
 
+    dedup_keys = df.pop("_dedup_key")
+
     # Validate required columns
     required_columns = config.get("analysis", {}).get("required_columns", [])
     validate_required_columns(df, required_columns)
 
     # Write curated parquet file
     logger.info(f"Writing curated dataset to {output_path}")
-    df.to_parquet(output_path, index=False, compression="snappy")
+    write_curated_parquet(df, output_path)
+    write_dedup_index(dedup_keys, output_path)
 
     # Summary stats
     logger.info("Ingestion complete:")